@@ -1,3 +1,4 @@
+import json
 import sqlite3
 import typing
 
@@ -7,7 +8,7 @@ CREATE TABLE IF NOT EXISTS article_edges (
     article_id INTEGER NOT NULL,
     category_id INTEGER NOT NULL,
     PRIMARY KEY (article_id, category_id)
-);
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS articles (
     id INTEGER NOT NULL,
@@ -17,22 +18,66 @@ CREATE TABLE IF NOT EXISTS articles (
 
 _DATABASE_PATH = "articles.db"
 
+# page_size has to be set before WAL is enabled and before any table exists.
+_PRAGMAS = """
+PRAGMA page_size = 32768;
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -262144;
+PRAGMA mmap_size = 30000000000;
+"""
+
+# Exclusive locking skips the shared-memory index but blocks other readers,
+# so it is only used while bulk loading.
+_INGEST_PRAGMAS = """
+PRAGMA locking_mode = EXCLUSIVE;
+"""
+
+
+def connect_sqlite(path: str, schema: str, ingest: bool = False) -> sqlite3.Connection:
+    """
+    Open a SQLite database with the settings shared by the articles and wiki
+    databases, and create its schema.
+
+    :param path: The path of the database file.
+    :param schema: The schema script to run after the PRAGMAs.
+    :param ingest: Take an exclusive lock for bulk loading.
+    """
+
+    connection = sqlite3.connect(path, isolation_level=None, cached_statements=1024)
+    connection.executescript(_PRAGMAS)
+
+    if ingest:
+        connection.executescript(_INGEST_PRAGMAS)
 
-def db_connect(path: str = _DATABASE_PATH, schema: str = _SCHEMA) -> sqlite3.Connection:
-    connection = sqlite3.connect(path)
     connection.executescript(schema)
     return connection
 
 
+def db_connect(
+    path: str = _DATABASE_PATH, schema: str = _SCHEMA, ingest: bool = False
+) -> sqlite3.Connection:
+    return connect_sqlite(path, schema, ingest)
+
+
 class ArticlesDb:
     connection: sqlite3.Connection
 
     def __init__(self, connection: sqlite3.Connection):
         self.connection = connection
         self.connection.isolation_level = None
+
+        # Reused by the single-result queries; articles() opens its own cursor
+        # so it can be iterated alongside them.
+        self._cursor = connection.cursor()
+
+    def close(self):
+        self._cursor.close()
+        self.connection.close()
     
     def remove_articles_in_category(self, category_id: int):
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute("BEGIN")
         
@@ -42,10 +87,9 @@ class ArticlesDb:
         )
 
         cursor.execute("COMMIT")
-        cursor.close()
     
     def article_count(self, category_id: int) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute(
             "SELECT COUNT(1) FROM article_edges WHERE category_id =?",
@@ -60,6 +104,26 @@ class ArticlesDb:
 
         return result[0]
     
+    def article_counts(
+        self, category_ids: typing.Optional[typing.Iterable[int]] = None
+    ) -> typing.Dict[int, int]:
+        cursor = self._cursor
+
+        if category_ids is None:
+            cursor.execute(
+                "SELECT category_id, COUNT(1) FROM article_edges GROUP BY category_id"
+            )
+        else:
+            cursor.execute(
+                "SELECT category_id, COUNT(1) FROM article_edges "
+                "WHERE category_id IN (SELECT value FROM json_each(?)) GROUP BY category_id",
+                (json.dumps(list(category_ids)),)
+            )
+
+        counts = dict(cursor.fetchall())
+
+        return counts
+    
     def articles(self, category_id: int) -> typing.Generator[int, None, None]:
         cursor = self.connection.cursor()
 
@@ -68,7 +132,7 @@ class ArticlesDb:
             (category_id,)
         )
 
-        while row := cursor.fetchone():
+        for row in cursor:
             yield row[0]
 
         cursor.close()
@@ -1,16 +1,68 @@
-import ast
 import gzip
+import io
 import pathlib
 import re
 from abc import ABC, abstractmethod
-from typing import Generator, NamedTuple, Generator, Optional
+from typing import BinaryIO, Generator, Iterable, Iterator, NamedTuple, Generator, Optional
 
 import requests
 from tqdm import tqdm
 
-_STRING_VALUE = r"'[^'\\]*(?:\\.[^'\\]*)*'"
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+# ISA-L's inflate is a drop-in for zlib's decompressobj and a few times faster.
+try:
+    from isal import isal_zlib as zlib
+except ImportError:
+    import zlib
+
+# A quoted value can only end at its first unescaped quote, so its quantifiers
+# are possessive (Python 3.11+) and a failing row never backtracks into it.
+_STRING_VALUE = r"'[^'\\]*+(?:\\.[^'\\]*+)*+'"
 _INTEGER_VALUE = r"\d+"
-_FLOAT_VALUE = r"\d+\.\d+"
+
+# Compressed input is read in 1 MiB blocks, decompressed output from file-like
+# decompressors is consumed in 128 KiB blocks.
+_BUFFER_SIZE = 1 << 20
+_READ_SIZE = 1 << 17
+
+# Lets zlib parse the gzip header and verify the trailer checksum itself.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+_GZIP_MAGIC = b"\x1f\x8b"
+
+_ESCAPE = re.compile(rb"\\(.)", re.DOTALL).sub
+
+# mysqldump escapes; any other escaped character stands for itself.
+_ESCAPED_CHARS = {
+    b"0": b"\0",
+    b"b": b"\b",
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"Z": b"\x1a",
+}
+
+
+def _unescape_char(match: re.Match) -> bytes:
+    char = match[1]
+    return _ESCAPED_CHARS.get(char, char)
+
+
+def _unescape(value: bytes) -> str:
+    """
+    Decode a quoted SQL string value, e.g. ``b"'Foo\\'s'"`` becomes ``"Foo's"``.
+    """
+
+    value = value[1:-1]
+
+    # Most values contain no escapes, skip the substitution for those.
+    if b"\\" in value:
+        value = _ESCAPE(_unescape_char, value)
+
+    return value.decode("utf-8", "replace")
 
 
 class CategoryLinksEntry(NamedTuple):
@@ -25,9 +77,104 @@ class PageTableEntry(NamedTuple):
     is_article: bool
 
 
+def _split_lines(blocks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    tail = bytearray()
+
+    for block in blocks:
+        head, newline, rest = block.rpartition(b"\n")
+
+        if not newline:
+            tail += block
+            continue
+
+        tail += head
+
+        yield from bytes(tail).split(b"\n")
+
+        tail = bytearray(rest)
+
+    if tail:
+        yield bytes(tail)
+
+
+class _ProgressReader(io.RawIOBase):
+    """
+    Raw stream wrapper that advances a progress bar by the bytes of each read.
+    """
+
+    def __init__(self, raw: BinaryIO, p_bar: tqdm) -> None:
+        super().__init__()
+
+        self.raw = raw
+        self.p_bar = p_bar
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        size = self.raw.readinto(buffer)
+        self.p_bar.update(size)
+        return size
+
+
+def _gunzip_blocks(f: BinaryIO) -> Generator[bytes, None, None]:
+    """
+    Decompress a gzip stream, feeding zlib 1 MiB of compressed input at a time.
+
+    Like ``GzipFile``, concatenated members are decompressed one after another
+    and zero padding between or after them is skipped.
+    """
+
+    decompressor = None
+    data = b""
+
+    while block := f.read(_BUFFER_SIZE):
+        data += block
+
+        while data:
+            if decompressor is None:
+                data = data.lstrip(b"\0")
+
+                # Wait for more input if a member header was split by a read.
+                if len(data) < len(_GZIP_MAGIC):
+                    break
+
+                if not data.startswith(_GZIP_MAGIC):
+                    raise gzip.BadGzipFile(f"Not a gzipped file ({data[:2]!r})")
+
+                decompressor = zlib.decompressobj(_GZIP_WBITS)
+
+            yield decompressor.decompress(data)
+
+            if not decompressor.eof:
+                data = b""
+                break
+
+            data = decompressor.unused_data
+            decompressor = None
+
+    if decompressor is not None or data:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+
+
+def _gunzip_local_blocks(file_obj: BinaryIO) -> Generator[bytes, None, None]:
+    """
+    Decompress a seekable gzip file, in parallel with rapidgzip when it is
+    installed.
+    """
+
+    if rapidgzip is None:
+        yield from _gunzip_blocks(file_obj)
+        return
+
+    with rapidgzip.open(file_obj, parallelization=0) as f:
+        while block := f.read(_READ_SIZE):
+            yield block
+
+
 def _stream_remote_lines_gzipped(
     url: str, progress: bool, description: str | None
-) -> Generator[str, None, None]:
+) -> Generator[bytes, None, None]:
     with requests.get(url, stream=True, timeout=1000) as r:
         raw = r.raw
 
@@ -43,22 +190,16 @@ def _stream_remote_lines_gzipped(
                 desc=description,
             )
 
-        last_position = 0
+        source = raw if p_bar is None else _ProgressReader(raw, p_bar)
 
-        with gzip.open(raw, mode="rt", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                yield line # type: ignore
-
-                if p_bar is not None:
-                    p_bar.update(raw.tell() - last_position)
-                    last_position = raw.tell()
+        yield from _split_lines(_gunzip_blocks(source))  # type: ignore
 
         if p_bar is not None:
             p_bar.close()
 
 
 def _stream_lines_gzipped(
-    path: pathlib.Path, progress: bool, description: str | None) -> Generator[str, None, None]:
+    path: pathlib.Path, progress: bool, description: str | None) -> Generator[bytes, None, None]:
 
     p_bar: Optional[tqdm] = None
     last_position = 0
@@ -73,28 +214,23 @@ def _stream_lines_gzipped(
             desc=description,
         )
 
-    with path.open("rb") as raw_file_obj:
-        with gzip.open(raw_file_obj, mode="rt", encoding="utf-8", errors="ignore") as f:
-            line = f.readline()
-
-            while line:
-                yield line # type: ignore
+    with path.open("rb", buffering=_BUFFER_SIZE) as raw_file_obj:
+        for line in _split_lines(_gunzip_local_blocks(raw_file_obj)):
+            yield line
 
-                if p_bar is not None:
-                    current_position = raw_file_obj.tell()
-                    p_bar.update(current_position - last_position)
-                    last_position = current_position
-                
-                line = f.readline()
-            
             if p_bar is not None:
-                p_bar.close()
+                current_position = raw_file_obj.tell()
+                p_bar.update(current_position - last_position)
+                last_position = current_position
+        
+        if p_bar is not None:
+            p_bar.close()
 
 
 class Asset(ABC):
 
     @abstractmethod
-    def stream_lines(self) -> Generator[str, None, None]:
+    def stream_lines(self) -> Generator[bytes, None, None]:
         pass
 
 
@@ -113,7 +249,7 @@ class RemoteAsset(Asset):
     def updated(self) -> str:
         return requests.head(self.url, timeout=1000).headers["last-modified"]
 
-    def stream_lines(self) -> Generator[str, None, None]:
+    def stream_lines(self) -> Generator[bytes, None, None]:
         return _stream_remote_lines_gzipped(self.url, self.progress, self.description)
     
 
@@ -130,16 +266,27 @@ class LocalAsset(Asset):
         self.progress = progress
         self.description = description
     
-    def stream_lines(self) -> Generator[str, None, None]:
+    def stream_lines(self) -> Generator[bytes, None, None]:
         return _stream_lines_gzipped(self.path, self.progress, self.description)
     
 class WikiTable(ABC):
 
     asset: Asset
+    pattern: re.Pattern
 
     def __init__(self, asset: Asset) -> None:
         self.asset = asset
 
+    def matches(self, line: bytes) -> Iterator[re.Match]:
+        """
+        Find all rows matched by the table pattern in a dump line.
+
+        :param line: A line of the decompressed dump.
+        :returns: An iterator of ``re`` matches, in order and non-overlapping.
+        """
+
+        return self.pattern.finditer(line)
+
     @abstractmethod
     def entries(self) -> Generator[NamedTuple, None, None]:
         pass
@@ -148,47 +295,42 @@ class WikiTable(ABC):
 class CategoryLinksTable(WikiTable):
 
     pattern: re.Pattern = re.compile(
-        rf"\(({_INTEGER_VALUE}),({_STRING_VALUE}),(?:{_STRING_VALUE},){{4}}'((?:page)|(?:subcat))'\)"
+        rf"\(({_INTEGER_VALUE}),({_STRING_VALUE}),(?:{_STRING_VALUE},){{4}}'((?:page)|(?:subcat))'\)".encode()
     )
     
     def entries(
         self
     ) -> Generator[CategoryLinksEntry, None, None]:
         for line in self.asset.stream_lines():
-            for hit in self.pattern.findall(
-                line,
-            ):
-                cl_from, cl_to, article_or_subcat = hit
-
-                is_article: bool = article_or_subcat == "page"
-
-                cl_from = int(cl_from)
-                cl_to = ast.literal_eval(cl_to)
-
-                yield CategoryLinksEntry(cl_from=cl_from, cl_to=cl_to, is_article=is_article)
+            for match in self.matches(line):
+                yield CategoryLinksEntry(
+                    cl_from=int(match.group(1)),
+                    cl_to=_unescape(match.group(2)),
+                    is_article=match.group(3) == b"page",
+                )
 
 
 class PageTable(WikiTable):
 
+    # Only page_id, page_namespace, page_title and page_is_redirect are
+    # matched. Quotes inside values are escaped, so a row cannot falsely match
+    # within the remaining columns and the scan just skips over them. Rows are
+    # not pre-split on "),(" since titles may contain that sequence.
     pattern: re.Pattern = re.compile(
         rf"\(({_INTEGER_VALUE}),((?:14)|(?:0)),"
-        rf"({_STRING_VALUE}),0,"
-        rf"{_INTEGER_VALUE},{_FLOAT_VALUE},"
-        rf"{_STRING_VALUE},{_STRING_VALUE},"
-        rf"{_INTEGER_VALUE},{_INTEGER_VALUE},"
-        rf"{_STRING_VALUE},(?:{_STRING_VALUE}|NULL)\)"
+        rf"({_STRING_VALUE}),0,".encode()
     )
 
     def entries(self) -> Generator[PageTableEntry, None, None]:
         for line in self.asset.stream_lines():
-            for hit in self.pattern.findall(line):
-                page_id, namespace, name = hit
-
-                page_id = int(page_id)
-                is_article = namespace == "0"
-                page_title = None if is_article else ast.literal_eval(name)
-
-                yield PageTableEntry(page_id=page_id, page_title=page_title, is_article=is_article)
+            for match in self.matches(line):
+                is_article = match.group(2) == b"0"
+
+                yield PageTableEntry(
+                    page_id=int(match.group(1)),
+                    page_title=None if is_article else _unescape(match.group(3)),
+                    is_article=is_article,
+                )
 
 
 class WikiTables(NamedTuple):
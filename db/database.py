@@ -1,7 +1,10 @@
+import itertools
+import json
 import os
 import sqlite3
 import typing
 
+from db.articles import connect_sqlite
 from db.assets import WikiTables, PageTable, CategoryLinksTable
 
 
@@ -10,7 +13,7 @@ CREATE TABLE IF NOT EXISTS category_edges (
     child_id INTEGER NOT NULL,
     parent_id INTEGER NOT NULL,
     PRIMARY KEY (child_id, parent_id)
-);
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS categories (
     id INTEGER NOT NULL,
@@ -22,7 +25,7 @@ CREATE TABLE IF NOT EXISTS article_edges (
     article_id INTEGER NOT NULL,
     category_id INTEGER NOT NULL,
     PRIMARY KEY (article_id, category_id)
-);
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS articles (
     id INTEGER NOT NULL,
@@ -30,13 +33,46 @@ CREATE TABLE IF NOT EXISTS articles (
 );
 """
 
+# Category links are staged unresolved and joined against the pages once all
+# inserts are done and the title index exists.
+_STAGING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS category_links_raw (
+    cl_from INTEGER NOT NULL,
+    cl_to TEXT NOT NULL,
+    is_article INTEGER NOT NULL
+);
+"""
+
 _DATABASE_PATH = "wiki_database.db"
 
+_INSERT_BATCH_SIZE = 50_000
+
+_T = typing.TypeVar("_T")
+
+# The article count of every category from one grouped scan of article_edges,
+# minus each category's self edge. Categories without edges count as -1.
+_CATEGORY_ARTICLE_COUNTS = """
+WITH counts AS (
+    SELECT category_id, COUNT(1) - 1 AS cnt FROM article_edges GROUP BY category_id
+),
+category_counts AS (
+    SELECT c.id AS id, COALESCE(counts.cnt, -1) AS cnt
+    FROM categories c LEFT JOIN counts ON counts.category_id = c.id
+)
+"""
+
+
+def _chunks(iterable: typing.Iterable[_T], size: int) -> typing.Generator[typing.List[_T], None, None]:
+    iterator = iter(iterable)
+
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
 
-def db_connect(path: str = _DATABASE_PATH, schema: str = _SCHEMA) -> sqlite3.Connection:
-    connection = sqlite3.connect(path)
-    connection.executescript(schema)
-    return connection
+
+def db_connect(
+    path: str = _DATABASE_PATH, schema: str = _SCHEMA, ingest: bool = False
+) -> sqlite3.Connection:
+    return connect_sqlite(path, schema, ingest)
 
 
 class WikiDatabaseOperations:
@@ -44,6 +80,14 @@ class WikiDatabaseOperations:
 
     def __init__(self, connection: sqlite3.Connection) -> None:
         self.connection = connection
+
+        # Reused by the single-result queries; generators and bulk loads open
+        # their own cursors so they can run alongside them.
+        self._cursor = connection.cursor()
+
+    def close(self) -> None:
+        self._cursor.close()
+        self.connection.close()
     
     def insert_wiki_tables(self, tables: WikiTables) -> None:
         
@@ -52,11 +96,14 @@ class WikiDatabaseOperations:
         # Managing transactions manually is faster than 
         # using implicit transactions.
 
+        # Everything is inserted before any index is built, so each index is
+        # created once instead of being maintained row by row.
         self.insert_pages(tables.pages)
+        self.insert_category_links(tables.category_links)
         self.create_pages_indices()
 
-        self.insert_category_links(tables.category_links)
-        self.insert_category_self_articles()
+        self.insert_edges()
+        self.drop_category_links()
         self.create_category_edges_indices()
         self.create_article_edges_indices()
 
@@ -65,24 +112,26 @@ class WikiDatabaseOperations:
     def insert_pages(self, page_table: PageTable) -> int:
         cursor = self.connection.cursor()
 
+        row_count = 0
+
         cursor.execute("BEGIN")
 
-        for page in page_table.entries():
-            if page.is_article:
-                cursor.execute(
-                    "INSERT INTO articles (id) VALUES (?)",
-                    (page.page_id,)
-                )
-                continue
+        # One pass over the pages feeds both tables, so they are split per
+        # batch instead of letting executemany consume the entries directly.
+        for pages in _chunks(page_table.entries(), _INSERT_BATCH_SIZE):
+            cursor.executemany(
+                "INSERT INTO articles (id) VALUES (?)",
+                ((page.page_id,) for page in pages if page.is_article)
+            )
+            row_count += cursor.rowcount
 
-            cursor.execute(
+            cursor.executemany(
                 "INSERT INTO categories (id, title) VALUES (?,?)",
-                (page.page_id, page.page_title)
+                ((page.page_id, page.page_title) for page in pages if not page.is_article)
             )
-        
-        cursor.execute("COMMIT")
+            row_count += cursor.rowcount
 
-        row_count = cursor.rowcount
+        cursor.execute("COMMIT")
         cursor.close()
 
         return row_count
@@ -101,97 +150,114 @@ class WikiDatabaseOperations:
     def insert_category_links(self, category_links_table: CategoryLinksTable) -> int:
         cursor = self.connection.cursor()
 
+        cursor.executescript(_STAGING_SCHEMA)
+
         cursor.execute("BEGIN")
 
-        for category_link in category_links_table.entries():
-            if category_link.is_article:
-                cursor.execute(
-                    "INSERT INTO article_edges SELECT ?, c.id FROM categories c WHERE "
-                    "EXISTS (SELECT 1 FROM articles a WHERE a.id = ?) AND c.title = ?",
-                    (category_link.cl_from, category_link.cl_from, category_link.cl_to)
-                )
-                continue
-
-            cursor.execute(
-                "INSERT INTO category_edges SELECT ?, c.id FROM categories c WHERE "
-                "c.title = ?",
-                (category_link.cl_from, category_link.cl_to) 
-            )
+        cursor.executemany(
+            "INSERT INTO category_links_raw (cl_from, cl_to, is_article) VALUES (?,?,?)",
+            category_links_table.entries()
+        )
+        row_count = cursor.rowcount
 
         cursor.execute("COMMIT")
-
-        row_count = cursor.rowcount
         cursor.close()
 
         return row_count
     
-    def create_category_edges_indices(self) -> None:
+    def insert_edges(self) -> int:
+        """
+        Resolve the staged category links into article and category edges.
+
+        Every category is also linked to itself as an article, which is why
+        article counts subtract one.
+
+        :returns: The number of edges inserted.
+        """
+
         cursor = self.connection.cursor()
+        row_count = 0
 
         cursor.execute("BEGIN")
-        cursor.execute("CREATE INDEX IF NOT EXISTS category_edges_child_index ON category_edges (child_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS category_edges_parent_index ON category_edges (parent_id)")
+
+        cursor.execute(
+            "INSERT INTO article_edges SELECT r.cl_from, c.id FROM category_links_raw r "
+            "JOIN categories c ON c.title = r.cl_to "
+            "JOIN articles a ON a.id = r.cl_from "
+            "WHERE r.is_article = 1 "
+            "UNION ALL SELECT c.id, c.id FROM categories c"
+        )
+        row_count += cursor.rowcount
+
+        cursor.execute(
+            "INSERT INTO category_edges SELECT r.cl_from, c.id FROM category_links_raw r "
+            "JOIN categories c ON c.title = r.cl_to "
+            "WHERE r.is_article = 0"
+        )
+        row_count += cursor.rowcount
+
         cursor.execute("COMMIT")
+        cursor.close()
+
+        return row_count
+    
+    def drop_category_links(self) -> None:
+        cursor = self.connection.cursor()
+
+        cursor.execute("DROP TABLE IF EXISTS category_links_raw")
 
         cursor.close()
     
-    def create_article_edges_indices(self) -> None:
+    def create_category_edges_indices(self) -> None:
         cursor = self.connection.cursor()
 
         cursor.execute("BEGIN")
-        cursor.execute("CREATE INDEX IF NOT EXISTS article_edges_article_index ON article_edges (article_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS article_edges_category_index ON article_edges (category_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS category_edges_child_index ON category_edges (child_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS category_edges_parent_index ON category_edges (parent_id)")
         cursor.execute("COMMIT")
 
         cursor.close()
     
-    def insert_category_self_articles(self) -> None:
+    def create_article_edges_indices(self) -> None:
         cursor = self.connection.cursor()
 
         cursor.execute("BEGIN")
-        cursor.execute("INSERT INTO article_edges SELECT c.id, c.id FROM categories c")
+        cursor.execute("CREATE INDEX IF NOT EXISTS article_edges_article_index ON article_edges (article_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS article_edges_category_index ON article_edges (category_id)")
         cursor.execute("COMMIT")
 
         cursor.close()
     
     def category_count(self) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute("SELECT COUNT(1) FROM categories")
         category_count = cursor.fetchone()[0]
 
-        cursor.close()
-
         return category_count
     
     def article_count(self) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute("SELECT COUNT(1) FROM articles")
         article_count = cursor.fetchone()[0]
 
-        cursor.close()
-
         return article_count
 
     def category_edge_count(self) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute("SELECT COUNT(1) FROM category_edges")
         edge_count = cursor.fetchone()[0]
 
-        cursor.close()
-
         return edge_count
 
     def article_edge_count(self) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute("SELECT COUNT(1) FROM article_edges")
         edge_count = cursor.fetchone()[0]
 
-        cursor.close()
-
         return edge_count
 
     def summary(self) -> str:
@@ -209,16 +275,7 @@ class WikiDatabaseOperations:
         :param category_ids: The ids of the categories to remove.
         """
 
-        cursor = self.connection.cursor()
-
-        for category_id in category_ids:
-            cursor.execute(
-                "DELETE FROM categories WHERE id = ?", (category_id,)
-            )
-
-        self.connection.commit()
-        cursor.close()
-
+        self._delete_ids("categories", category_ids)
         self.remove_orphaned_category_edges()
     
     def remove_articles(self, article_ids: typing.Iterable[int]) -> None:
@@ -228,17 +285,44 @@ class WikiDatabaseOperations:
         :param article_ids: The ids of the articles to remove.
         """
 
+        self._delete_ids("articles", article_ids)
+        self.remove_orphaned_article_edges()
+    
+    def _delete_ids(self, table: str, ids: typing.Iterable[int]) -> None:
+        """
+        Delete rows by id with a single statement, joining against a temporary
+        table of the ids instead of deleting them one by one.
+
+        :param table: The table to delete from, either categories or articles.
+        :param ids: The ids of the rows to delete.
+        """
+
         cursor = self.connection.cursor()
 
-        for article_id in article_ids:
-            cursor.execute(
-                "DELETE FROM articles WHERE id = ?", (article_id,)
-            )
+        cursor.execute("BEGIN")
 
-        self.connection.commit()
-        cursor.close()
+        # A failure, including one raised while consuming ids, must not leave
+        # the transaction open or block later writes on this connection.
+        try:
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _deleted_ids (id INTEGER PRIMARY KEY)")
+            cursor.execute("DELETE FROM _deleted_ids")
 
-        self.remove_orphaned_article_edges()
+            cursor.executemany(
+                "INSERT OR IGNORE INTO _deleted_ids (id) VALUES (?)",
+                ((id_,) for id_ in ids)
+            )
+
+            cursor.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM _deleted_ids)")
+
+            # The table is emptied rather than dropped, DROP TABLE fails while
+            # any statement on the connection, such as an id generator, is open.
+            cursor.execute("DELETE FROM _deleted_ids")
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
     
     def remove_orphaned_category_edges(self):
         """
@@ -247,11 +331,15 @@ class WikiDatabaseOperations:
 
         cursor = self.connection.cursor()
 
+        cursor.execute("BEGIN")
+
         cursor.execute(
-            "DELETE FROM category_edges WHERE child_id NOT IN (SELECT id FROM categories) OR parent_id NOT IN (SELECT id FROM categories)"
+            "DELETE FROM category_edges "
+            "WHERE NOT EXISTS (SELECT 1 FROM categories WHERE id = child_id) "
+            "OR NOT EXISTS (SELECT 1 FROM categories WHERE id = parent_id)"
         )
 
-        self.connection.commit()
+        cursor.execute("COMMIT")
         cursor.close()
 
     def remove_orphaned_article_edges(self):
@@ -261,11 +349,15 @@ class WikiDatabaseOperations:
 
         cursor = self.connection.cursor()
 
+        cursor.execute("BEGIN")
+
         cursor.execute(
-            "DELETE FROM article_edges WHERE article_id NOT IN (SELECT id FROM articles) OR category_id NOT IN (SELECT id FROM categories)"
+            "DELETE FROM article_edges "
+            "WHERE NOT EXISTS (SELECT 1 FROM articles WHERE id = article_id) "
+            "OR NOT EXISTS (SELECT 1 FROM categories WHERE id = category_id)"
         )
 
-        self.connection.commit()
+        cursor.execute("COMMIT")
         cursor.close()
     
     def article_count_by_percentile(self, percentile: float) -> int:
@@ -277,16 +369,14 @@ class WikiDatabaseOperations:
 
         assert 0.0 <= percentile  < 1.0, "Percentile must be in the range [0, 1)."
 
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute(
-            "SELECT c.id, (SELECT COUNT(1) - 1 FROM article_edges a WHERE a.category_id = c.id) AS article_count FROM categories c ORDER BY article_count ASC LIMIT 1 OFFSET ?",
+            f"{_CATEGORY_ARTICLE_COUNTS} SELECT cnt FROM category_counts ORDER BY cnt ASC LIMIT 1 OFFSET ?",
             (int(percentile * self.category_count()),)
         )
 
-        page_count = cursor.fetchone()[1]
-
-        cursor.close()
+        page_count = cursor.fetchone()[0]
 
         return page_count
 
@@ -301,11 +391,11 @@ class WikiDatabaseOperations:
         cursor = self.connection.cursor()
 
         cursor.execute(
-            "SELECT c.id, (SELECT COUNT(1) - 1 FROM article_edges a WHERE a.category_id = c.id) AS article_count FROM categories c WHERE article_count < ?",
+            f"{_CATEGORY_ARTICLE_COUNTS} SELECT id FROM category_counts WHERE cnt < ?",
             (article_count,)
         )
 
-        while row := cursor.fetchone():
+        for row in cursor:
             yield row[0]
 
         cursor.close()
@@ -325,7 +415,7 @@ class WikiDatabaseOperations:
             (category_id,)
         )
 
-        while row := cursor.fetchone():
+        for row in cursor:
             yield row[0]
 
         cursor.close()
@@ -345,7 +435,7 @@ class WikiDatabaseOperations:
             (category_id,)
         )
 
-        while row := cursor.fetchone():
+        for row in cursor:
             yield row[0]
 
         cursor.close()
@@ -365,7 +455,7 @@ class WikiDatabaseOperations:
             (category_id,)
         )
 
-        while row := cursor.fetchone():
+        for row in cursor:
             yield row[0]
 
         cursor.close()
@@ -383,8 +473,7 @@ class WikiDatabaseOperations:
             "SELECT parent_id, child_id FROM category_edges"
         )
 
-        while row := cursor.fetchone():
-            yield row[0], row[1]
+        yield from cursor
 
         cursor.close()
     
@@ -393,7 +482,7 @@ class WikiDatabaseOperations:
         Get a random category.
         """
 
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute(
             "SELECT id FROM categories ORDER BY RANDOM() LIMIT 1"
@@ -401,8 +490,6 @@ class WikiDatabaseOperations:
 
         category_id = cursor.fetchone()[0]
 
-        cursor.close()
-
         return category_id
     
     def title(self, category_id: int) -> str:
@@ -413,7 +500,7 @@ class WikiDatabaseOperations:
         :returns: The title of the category.
         """
 
-        cursor = self.connection.cursor()
+        cursor = self._cursor
 
         cursor.execute(
             "SELECT title FROM categories WHERE id =?",
@@ -422,10 +509,25 @@ class WikiDatabaseOperations:
 
         title = cursor.fetchone()[0]
 
-        cursor.close()
-
         return title
     
+    def titles(self, category_ids: typing.Iterable[int]) -> typing.Dict[int, str]:
+        """
+        Get the titles of many categories with a single query.
+
+        :param category_ids: The ids of the categories.
+        :returns: A dict of category id to title, without ids that do not exist.
+        """
+
+        cursor = self._cursor
+
+        cursor.execute(
+            "SELECT id, title FROM categories WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(category_ids)),)
+        )
+
+        return dict(cursor.fetchall())
+    
 
 
         
@@ -1,111 +1,226 @@
+from array import array
 from dataclasses import dataclass
 import json
+import os
 import pathlib
 import typing
 
 
 import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 from db.assets import WikiTables
 from db.articles import ArticlesDb, db_connect
 
 
+# Page ids are well below 2**32, so the tree stores them at half the width of
+# a default integer array.
+_ID_DTYPE = np.uint32
+_MAX_ID = np.iinfo(_ID_DTYPE).max
+
+# Serialized trees start with this signature, followed by a one line JSON
+# header and then the raw arrays in _SERIALIZED_ARRAYS order, and finally the
+# newline-joined category names. Files without it are read as legacy JSON.
+_MAGIC = b"AWTREE\x00\x01"
+_SERIALIZED_ARRAYS = ("nodes", "parents", "children", "ids")
+
+
 @dataclass
 class Tree:
+    """
+    Category tree stored as parallel arrays rather than Python objects.
+
+    Edge ``i`` goes from ``parents[i]`` to ``children[i]``, with both arrays
+    sorted by parent so successors are found by binary search. ``nodes`` holds
+    every category id in the tree, including ones left without any edges.
+    All three are ``uint32`` arrays.
+    """
+
     articles_db: ArticlesDb
     id_to_name: typing.Dict[int, str]
-    graph: nx.DiGraph 
+    nodes: np.ndarray
+    parents: np.ndarray
+    children: np.ndarray
 
     @classmethod
-    def deserialize(cls, path: pathlib.Path):
-        with open(path, "r") as f:
-            in_dict = json.load(f)
+    def from_edges(
+        cls,
+        articles_db: ArticlesDb,
+        id_to_name: typing.Dict[int, str],
+        parents: np.ndarray,
+        children: np.ndarray,
+    ):
+        order = np.argsort(parents, kind="stable")
 
-        id_to_name = in_dict["id_to_name"]
-        edges = in_dict["edges"]
+        return cls(
+            articles_db=articles_db,
+            id_to_name=id_to_name,
+            nodes=np.union1d(parents, children),
+            parents=parents[order],
+            children=children[order],
+        )
+
+    def to_networkx(self) -> nx.DiGraph:
+        """
+        Build a ``networkx`` copy of the tree.
+
+        The arrays are the tree's only state, so changes made to the returned
+        graph are not reflected in the tree.
+        """
 
         graph = nx.DiGraph()
 
-        graph.add_edges_from(edges)
+        graph.add_nodes_from(self.nodes.tolist())
+        graph.add_edges_from(zip(self.parents.tolist(), self.children.tolist()))
+
+        return graph
+
+    @classmethod
+    def deserialize(cls, path: pathlib.Path):
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return cls._deserialize_json(path)
+
+            header = json.loads(f.readline())
+            offset = f.tell()
+
+            dtype = np.dtype(header["dtype"])
+            arrays: typing.Dict[str, np.ndarray] = {}
+
+            for name in _SERIALIZED_ARRAYS:
+                length = header["lengths"][name]
+
+                # Memory map rather than read, so the arrays are paged in
+                # straight from the file without an intermediate copy.
+                arrays[name] = (
+                    np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(length,))
+                    if length
+                    else np.empty(0, dtype=dtype)
+                )
+
+                offset += length * dtype.itemsize
+
+            f.seek(offset)
+            names = f.read().decode("utf-8").split("\n") if header["lengths"]["ids"] else []
 
         return cls(
             articles_db=ArticlesDb(db_connect()),
-            id_to_name=id_to_name,
-            graph=graph,
+            id_to_name=dict(zip(arrays["ids"].tolist(), names)),
+            nodes=arrays["nodes"],
+            parents=arrays["parents"],
+            children=arrays["children"],
+        )
+
+    @classmethod
+    def _deserialize_json(cls, path: pathlib.Path):
+        with open(path, "r") as f:
+            in_dict = json.load(f)
+
+        id_to_name = {int(id_): name for id_, name in in_dict["id_to_name"].items()}
+        edges = np.array(in_dict["edges"], dtype=np.int64).reshape(-1, 2)
+
+        assert edges.size == 0 or 0 <= edges.min() and edges.max() <= _MAX_ID, (
+            "Category ids must fit in 32 bits."
+        )
+
+        edges = edges.astype(_ID_DTYPE)
+
+        return cls.from_edges(
+            ArticlesDb(db_connect()),
+            id_to_name,
+            edges[:, 0].copy(),
+            edges[:, 1].copy(),
         )
     
     def serialize(self, path: pathlib.Path):
-        out_dict = {
-            "id_to_name": self.id_to_name,
-            "edges": [e for e in self.graph.edges],
+        arrays = {
+            "nodes": self.nodes,
+            "parents": self.parents,
+            "children": self.children,
+            "ids": np.fromiter(self.id_to_name.keys(), dtype=self.nodes.dtype),
+        }
+
+        header = {
+            "dtype": self.nodes.dtype.str,
+            "lengths": {name: int(array.size) for name, array in arrays.items()},
         }
 
-        with open(path, "w") as f:
-            json.dump(out_dict, f, ensure_ascii=False, indent=1)
+        path = pathlib.Path(path)
+        temp_path = path.with_name(path.name + ".tmp")
+
+        # The arrays may be memory mapped from the file being replaced, so the
+        # tree is written to a separate file first instead of truncating it.
+        with open(temp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+
+            for name in _SERIALIZED_ARRAYS:
+                np.ascontiguousarray(arrays[name], dtype=self.nodes.dtype).tofile(f)
+
+            # Titles never contain newlines, so they are stored as one joined blob.
+            f.write("\n".join(self.id_to_name.values()).encode("utf-8"))
+
+        os.replace(temp_path, path)
     
     @classmethod
     def from_tables(cls, tables: WikiTables):
-        articles_db = ArticlesDb(db_connect())
+        ingest_connection = db_connect(ingest=True)
 
-        cursor = articles_db.connection.cursor()
+        cursor = ingest_connection.cursor()
 
-        def insert_article(article_id: int):
-            cursor.execute(
-                "INSERT INTO articles (id) VALUES (?)",
-                (article_id,)
-            )
-        
-        def contains_article(article_id: int):
-            cursor.execute(
-                "SELECT 1 FROM articles WHERE id =?",
-                (article_id,)
-            )
-
-            return cursor.fetchone() is not None
-
-        def insert_article_edge(article_id: int, category_id: int):
-            cursor.execute(
-                "INSERT INTO article_edges (article_id, category_id) VALUES (?,?)",
-                (article_id, category_id)
-            )
-        
+        article_ids: typing.Set[int] = set()
         cat_id_to_name: typing.Dict[int, str] = {}
 
-        cursor.execute("BEGIN")
-
         for entry in tables.pages.entries():
             if entry.is_article:
-                insert_article(entry.page_id)
+                article_ids.add(entry.page_id)
                 continue
 
             cat_id_to_name[entry.page_id] = entry.page_title  # type: ignore
         
-        cursor.execute("COMMIT")
+        cursor.execute("BEGIN")
+
+        cursor.executemany(
+            "INSERT INTO articles (id) VALUES (?)",
+            ((article_id,) for article_id in article_ids)
+        )
         
-        cat_name_to_id = {
-            name: id_
-            for id_, name in cat_id_to_name.items()
-        }
+        cat_name_to_id = dict(zip(cat_id_to_name.values(), cat_id_to_name))
 
-        cursor.execute("BEGIN")
+        # Unsigned int arrays raise OverflowError for ids that do not fit.
+        parents = array("I")
+        children = array("I")
 
-        edges: typing.List[typing.Tuple[int, int]] = []
+        def article_edges() -> typing.Generator[typing.Tuple[int, int], None, None]:
+            # Category edges are collected as a side effect, so the links are
+            # read once while executemany consumes the article edges lazily.
+            for entry in tables.category_links.entries():
+                child_id = entry.cl_from
 
-        for entry in tables.category_links.entries():
-            child_id = entry.cl_from
+                # Links often point at categories without a page, a lookup
+                # miss is cheaper than a raised KeyError.
+                parent_id = cat_name_to_id.get(entry.cl_to)
 
-            try:
-                parent_id = cat_name_to_id[entry.cl_to]
-            except KeyError:
-                continue
+                if parent_id is None:
+                    continue
 
-            if entry.is_article and contains_article(child_id):
-                insert_article_edge(child_id, parent_id)
-                continue
+                if not entry.is_article:
+                    parents.append(parent_id)
+                    children.append(child_id)
+                elif child_id in article_ids:
+                    yield child_id, parent_id
+
+        cursor.executemany(
+            "INSERT INTO article_edges (article_id, category_id) VALUES (?,?)",
+            article_edges()
+        )
+
+        # The lookup tables are only needed while reading links, drop them
+        # before the edge arrays are copied and sorted.
+        del cat_name_to_id, article_ids
 
-            if not entry.is_article:
-                edges.append((parent_id, child_id))
-        
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS article_id_idx ON article_edges(article_id)"
         )
@@ -117,28 +232,63 @@ class Tree:
         cursor.execute("COMMIT")
         cursor.close()
 
-        graph = nx.DiGraph()
-        graph.add_edges_from(edges)
+        # The exclusive lock taken for loading cannot be dropped in WAL mode,
+        # so the loading connection is closed and the tree gets a normal one.
+        ingest_connection.close()
+
+        return cls.from_edges(
+            ArticlesDb(db_connect()),
+            cat_id_to_name,
+            np.frombuffer(parents, dtype=_ID_DTYPE).copy(),
+            np.frombuffer(children, dtype=_ID_DTYPE).copy(),
+        )
+
+    def successors(self, category_id: int) -> np.ndarray:
+        start, end = np.searchsorted(self.parents, [category_id, category_id + 1])
+        return self.children[start:end]
+
+    def remove_nodes(self, category_ids: typing.Iterable[int]):
+        """
+        Remove categories and every edge touching them.
+
+        :param category_ids: The ids of the categories to remove.
+        """
+
+        removed = np.fromiter(category_ids, dtype=_ID_DTYPE)
+
+        kept_edges = ~(np.isin(self.parents, removed) | np.isin(self.children, removed))
 
-        return cls(articles_db, cat_id_to_name, graph)
+        self.nodes = self.nodes[~np.isin(self.nodes, removed)]
+        self.parents = self.parents[kept_edges]
+        self.children = self.children[kept_edges]
 
     def remove_categories_under_article_count(self, article_count: int):
-        to_remove = []
+        # Categories without any articles are missing from the counts.
+        counts = self.articles_db.article_counts(self.nodes.tolist())
 
-        for category_id in self.graph.nodes:
-            if self.articles_db.article_count(category_id) < article_count:
-                to_remove.append(category_id)
-        
-        self.graph.remove_nodes_from(to_remove)
+        node_counts = np.fromiter(
+            (counts.get(category_id, 0) for category_id in self.nodes.tolist()),
+            dtype=np.int64,
+            count=self.nodes.size,
+        )
+
+        self.remove_nodes(self.nodes[node_counts < article_count])
     
     def keep_largest_component(self):
-        largest_component = max(nx.weakly_connected_components(self.graph), key=len)
-        self.graph.remove_nodes_from(set(self.graph.nodes) - set(largest_component))
+        size = self.nodes.size
+
+        adjacency = csr_matrix(
+            (
+                np.ones(self.parents.size, dtype=np.int8),
+                (np.searchsorted(self.nodes, self.parents), np.searchsorted(self.nodes, self.children)),
+            ),
+            shape=(size, size),
+        )
+
+        _, labels = connected_components(adjacency, directed=False)
+        largest_component = labels == np.bincount(labels).argmax()
+
+        self.remove_nodes(self.nodes[~largest_component])
     
     def remove_subcategories(self, category_id: int):
-        to_remove = []
-
-        for child_id in self.graph.successors(category_id):
-            to_remove.append(child_id)
-        
-        self.graph.remove_nodes_from(to_remove)
\ No newline at end of file
+        self.remove_nodes(self.successors(category_id))
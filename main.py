@@ -1,6 +1,7 @@
 import argparse
 import os
 import re
+from itertools import islice
 from pathlib import Path
 from pprint import pprint
 from typing import Optional
@@ -15,6 +16,14 @@ from db.utils import CategoryNotFound, id_for_category_str_by_lang
 
 _graph_path = Path("graph.bytes")
 
+_INSERT_BATCH_SIZE = 10_000
+
+_EXCLUDE_PATTERN = re.compile(
+    r"^[a-z]+-(?:class|importance)|^redirect|"
+    r"(?:stub|template|list)s?$|wikiproject|^wikipedia"
+)
+_exclude_search = _EXCLUDE_PATTERN.search
+
 
 def main(
     language: str,
@@ -57,15 +66,7 @@ def main(
     print(f"Excluding category ids: {excluded_ids}")
 
     def remove_no_reconstruct(_: int, x: CategoryAttributes) -> bool:
-        name: str = x["name"]
-        name = name.lower()
-
-        exclude_pattern = re.compile(
-            r"^[a-z]+-(?:class|importance)|^redirect|"
-            r"(?:stub|template|list)s?$|wikiproject|^wikipedia"
-        )
-
-        return exclude_pattern.search(name) is not None
+        return _exclude_search(x["name"].lower()) is not None
 
     tree.remove_by_condition(remove_no_reconstruct, reconstruct=False)
 
@@ -86,7 +87,12 @@ def main(
 
     if not dry_run and edges_collection is not None:
         edges_collection.delete_many({})
-        edges_collection.insert_many(tree.to_dicts())
+        documents = iter(tree.to_dicts())
+
+        # Unordered batches let the server apply inserts without waiting on
+        # each one in turn, and bound how many documents are held in memory.
+        while batch := list(islice(documents, _INSERT_BATCH_SIZE)):
+            edges_collection.insert_many(batch, ordered=False)
 
     print("Done")
 
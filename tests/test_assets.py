@@ -0,0 +1,137 @@
+import gzip
+import io
+import unittest
+import zlib
+from unittest import mock
+
+from db import assets
+
+
+class _BytesAsset(assets.Asset):
+
+    def __init__(self, dump: str) -> None:
+        self.data = gzip.compress(dump.encode("utf-8"))
+
+    def stream_lines(self):
+        return assets._split_lines(assets._gunzip_blocks(io.BytesIO(self.data)))
+
+
+# Quotes, backslashes and control characters are escaped the way mysqldump
+# writes them, so these are raw strings.
+_PAGE_DUMP = r"""-- MySQL dump 10.19
+/*!40101 SET NAMES utf8mb4 */;
+INSERT INTO `page` VALUES (1,14,'Foo\'s_(bar)',0,0,0.5,'20240101000000','20240101000000',11,120,'wikitext',NULL),(2,0,'Some_article',0,1,0.25,'20240101000000','20240101000000',12,3400,'wikitext','en'),(3,14,'Redirected_category',1,0,0.75,'20240101000000','20240101000000',13,40,'wikitext',NULL),(4,2,'User_page',0,0,0.1,'20240101000000','20240101000000',14,50,'wikitext',NULL);
+INSERT INTO `page` VALUES (5,14,'A),(B',0,0,0.3,'20240101000000','20240101000000',15,60,'wikitext',NULL),(6,14,'Back\\slash_\n_\0_\Z_\"q\"',0,0,0.4,'20240101000000','20240101000000',16,70,'wikitext',NULL),(7,14,'Q\'),(9,0,\'x',0,0,0.6,'20240101000000','20240101000000',17,80,'wikitext','de'),(8,0,'Redirected_article',1,0,0.7,'20240101000000','20240101000000',18,90,'wikitext',NULL);
+/*!40000 ALTER TABLE `page` ENABLE KEYS */;
+"""
+
+_CATEGORY_LINKS_DUMP = r"""-- MySQL dump 10.19
+INSERT INTO `categorylinks` VALUES (1,'Foo\'s_(bar)','SORT','2024-01-01 00:00:00','','uppercase','subcat'),(2,'A),(B','SOME ARTICLE','2024-01-01 00:00:00','','uppercase','page'),(3,'Images','IMAGE.PNG','2024-01-01 00:00:00','','uppercase','file');
+INSERT INTO `categorylinks` VALUES (4,'Back\\slash_\n','a\'),(99,\'Fake\',\'\',\'\',\'\',\'\',\'page\')','2024-01-01 00:00:00','','uppercase','page');
+"""
+
+
+def _gunzip(data: bytes) -> bytes:
+    return b"".join(assets._gunzip_blocks(io.BytesIO(data)))
+
+
+class GunzipBlocksTest(unittest.TestCase):
+
+    text = b"".join(b"(%d,'Title_%d')\n" % (i, i) for i in range(2000))
+
+    def variants(self):
+        # Cover both the installed inflate backend and the stdlib fallback,
+        # with whole reads and with reads that split member headers.
+        for backend in {assets.zlib, zlib}:
+            for buffer_size in (assets._BUFFER_SIZE, 7):
+                with self.subTest(backend=backend.__name__, buffer_size=buffer_size), \
+                        mock.patch.object(assets, "zlib", backend), \
+                        mock.patch.object(assets, "_BUFFER_SIZE", buffer_size):
+                    yield
+
+    def assertGunzips(self, data: bytes, expected: bytes) -> None:
+        for _ in self.variants():
+            self.assertEqual(_gunzip(data), expected)
+
+    def assertGunzipRaises(self, exception: type, data: bytes) -> None:
+        for _ in self.variants():
+            with self.assertRaises(exception):
+                _gunzip(data)
+
+    def test_single_member(self) -> None:
+        self.assertGunzips(gzip.compress(self.text), self.text)
+
+    def test_multiple_members(self) -> None:
+        data = gzip.compress(self.text[:1000]) + gzip.compress(self.text[1000:])
+
+        self.assertGunzips(data, self.text)
+
+    def test_zero_padding(self) -> None:
+        member = gzip.compress(self.text)
+        data = member + b"\0" * 5 + member + b"\0" * 3
+
+        self.assertGunzips(data, gzip.decompress(data))
+
+    def test_empty_input(self) -> None:
+        self.assertGunzips(b"", b"")
+
+    def test_truncated(self) -> None:
+        self.assertGunzipRaises(EOFError, gzip.compress(self.text)[:-5])
+
+    def test_truncated_second_member(self) -> None:
+        self.assertGunzipRaises(EOFError, gzip.compress(self.text) + gzip.compress(self.text)[:20])
+
+    def test_not_gzip(self) -> None:
+        self.assertGunzipRaises(gzip.BadGzipFile, self.text)
+
+    def test_trailing_garbage(self) -> None:
+        self.assertGunzipRaises(gzip.BadGzipFile, gzip.compress(self.text) + b"garbage")
+
+
+class UnescapeTest(unittest.TestCase):
+
+    def test_plain(self) -> None:
+        self.assertEqual(assets._unescape(b"'Plain_title'"), "Plain_title")
+
+    def test_escapes(self) -> None:
+        self.assertEqual(
+            assets._unescape(rb"'\'\"\\\0\b\n\r\t\Z\q'"),
+            "'\"\\\0\b\n\r\t\x1aq",
+        )
+
+    def test_utf8(self) -> None:
+        self.assertEqual(assets._unescape("'Ünïcode_ß'".encode("utf-8")), "Ünïcode_ß")
+
+
+class PageTableTest(unittest.TestCase):
+
+    def test_entries(self) -> None:
+        entries = list(assets.PageTable(_BytesAsset(_PAGE_DUMP)).entries())
+
+        # Redirects and other namespaces are skipped, and quoted "),(" inside
+        # titles does not start a new row.
+        self.assertEqual(entries, [
+            assets.PageTableEntry(page_id=1, page_title="Foo's_(bar)", is_article=False),
+            assets.PageTableEntry(page_id=2, page_title=None, is_article=True),
+            assets.PageTableEntry(page_id=5, page_title="A),(B", is_article=False),
+            assets.PageTableEntry(page_id=6, page_title='Back\\slash_\n_\0_\x1a_"q"', is_article=False),
+            assets.PageTableEntry(page_id=7, page_title="Q'),(9,0,'x", is_article=False),
+        ])
+
+
+class CategoryLinksTableTest(unittest.TestCase):
+
+    def test_entries(self) -> None:
+        entries = list(assets.CategoryLinksTable(_BytesAsset(_CATEGORY_LINKS_DUMP)).entries())
+
+        # File links are skipped, and a row quoted inside a sort key is not
+        # matched.
+        self.assertEqual(entries, [
+            assets.CategoryLinksEntry(cl_from=1, cl_to="Foo's_(bar)", is_article=False),
+            assets.CategoryLinksEntry(cl_from=2, cl_to="A),(B", is_article=True),
+            assets.CategoryLinksEntry(cl_from=4, cl_to="Back\\slash_\n", is_article=True),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
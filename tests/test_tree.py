@@ -0,0 +1,97 @@
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+
+from db.articles import ArticlesDb, db_connect
+from db.tree import Tree
+
+
+class TreeSerializationTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        # Deserializing opens the articles database in the working directory.
+        cwd = os.getcwd()
+        os.chdir(temp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+
+        self.path = pathlib.Path(temp_dir.name) / "tree.bytes"
+
+    def make_tree(self) -> Tree:
+        articles_db = ArticlesDb(db_connect())
+        self.addCleanup(articles_db.close)
+
+        return Tree.from_edges(
+            articles_db,
+            {1: "Root", 2: "Ünïcode_ß", 3: "Bar's_(x)", 5: "Leaf"},
+            np.array([1, 1, 2, 3], dtype=np.uint32),
+            np.array([2, 3, 5, 5], dtype=np.uint32),
+        )
+
+    def load(self) -> Tree:
+        tree = Tree.deserialize(self.path)
+        self.addCleanup(tree.articles_db.close)
+        return tree
+
+    def assertTreesEqual(self, actual: Tree, expected: Tree) -> None:
+        self.assertEqual(actual.id_to_name, expected.id_to_name)
+
+        for name in ("nodes", "parents", "children"):
+            np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name))
+            self.assertEqual(getattr(actual, name).dtype, np.uint32)
+
+    def test_round_trip(self) -> None:
+        tree = self.make_tree()
+        tree.serialize(self.path)
+
+        self.assertTreesEqual(self.load(), tree)
+
+    def test_round_trip_after_removing_nodes(self) -> None:
+        tree = self.make_tree()
+        tree.remove_nodes([5])
+        tree.serialize(self.path)
+
+        loaded = self.load()
+
+        self.assertTreesEqual(loaded, tree)
+        np.testing.assert_array_equal(loaded.successors(1), [2, 3])
+        self.assertEqual(loaded.successors(2).size, 0)
+
+    def test_serialize_over_source_file(self) -> None:
+        tree = self.make_tree()
+        tree.serialize(self.path)
+
+        # The loaded arrays are memory mapped from the file being overwritten.
+        self.load().serialize(self.path)
+
+        self.assertTreesEqual(self.load(), tree)
+
+    def test_empty_tree(self) -> None:
+        articles_db = ArticlesDb(db_connect())
+        self.addCleanup(articles_db.close)
+
+        empty = np.empty(0, dtype=np.uint32)
+        tree = Tree.from_edges(articles_db, {}, empty, empty)
+        tree.serialize(self.path)
+
+        self.assertTreesEqual(self.load(), tree)
+
+    def test_legacy_json(self) -> None:
+        with open(self.path, "w") as f:
+            json.dump({"id_to_name": {"1": "Root", "2": "Leaf"}, "edges": [[1, 2]]}, f)
+
+        loaded = self.load()
+
+        self.assertEqual(loaded.id_to_name, {1: "Root", 2: "Leaf"})
+        np.testing.assert_array_equal(loaded.nodes, [1, 2])
+        np.testing.assert_array_equal(loaded.successors(1), [2])
+
+
+if __name__ == "__main__":
+    unittest.main()